@@ -1,7 +1,10 @@
 # game.py
 
+import asyncio
 import chess
+import heapq
 import time
+from concurrent.futures import ThreadPoolExecutor
 from players import Player
 from renderer import create_game_animation
 
@@ -16,21 +19,42 @@ class Game:
         chess.QUEEN: 9,
         chess.KING: 0
     }
+    # Opponent replies whose positions are prepared speculatively each ply
+    PREWARM_REPLIES = 3
 
-    def __init__(self, white_player: Player, black_player: Player):
+    def __init__(self, white_player: Player, black_player: Player, animation_filename: str | None = None):
         self.board = chess.Board()
+        # Defaults to a timestamped name when the game ends
+        self.animation_filename = animation_filename
         self.move_history = []
         self.players = {chess.WHITE: white_player, chess.BLACK: black_player}
         
+        # Material is counted once here and then updated incrementally on each move
+        self._material = {color: self._count_material(color) for color in chess.COLORS}
+        
         self.stats = {
             'illegal_moves': {chess.WHITE: 0, chess.BLACK: 0},
             'total_time': {chess.WHITE: 0.0, chess.BLACK: 0.0}
         }
+        # Background workers that warm player caches while an LLM is thinking
+        self._render_pool = ThreadPoolExecutor(max_workers=2)
+        self._prewarm_futures = []
+
+    def _count_material(self, color: chess.Color) -> int:
+        # Popcount the per-piece bitboards instead of walking the piece map.
+        return sum(value * chess.popcount(self.board.pieces_mask(piece_type, color)) for piece_type, value in self.PIECE_VALUES.items())
+
+    def _update_material(self, move: chess.Move):
+        """Adjusts the tracked material for a move. Must be called before the move is pushed."""
+        mover = self.board.turn
+        if self.board.is_capture(move):
+            captured_type = chess.PAWN if self.board.is_en_passant(move) else self.board.piece_type_at(move.to_square)
+            self._material[not mover] -= self.PIECE_VALUES[captured_type]
+        if move.promotion:
+            self._material[mover] += self.PIECE_VALUES[move.promotion] - self.PIECE_VALUES[chess.PAWN]
 
     def _calculate_material_advantage(self) -> tuple[int, int]:
-        white_material = sum(self.PIECE_VALUES[piece.piece_type] for piece in self.board.piece_map().values() if piece.color == chess.WHITE)
-        black_material = sum(self.PIECE_VALUES[piece.piece_type] for piece in self.board.piece_map().values() if piece.color == chess.BLACK)
-        return white_material, black_material
+        return self._material[chess.WHITE], self._material[chess.BLACK]
         
     def _display_turn_header(self, player_color_str: str):
         move_num = self.board.fullmove_number
@@ -53,8 +77,52 @@ class Game:
         print(f"Total thinking time for {player_color_str}: {total_time:.2f} seconds")
         print(f"Total illegal moves for {player_color_str}: {illegal_moves}")
 
+    def _likely_replies(self) -> list[chess.Move]:
+        """
+        Returns the opponent's PREWARM_REPLIES most forcing replies: recaptures on the
+        last move's square first, then other captures, then checks.
+        """
+        last_square = self.board.peek().to_square
+        def reply_rank(reply: chess.Move) -> tuple[bool, bool, bool]:
+            is_capture = self.board.is_capture(reply)
+            return (not (is_capture and reply.to_square == last_square), not is_capture,
+                    not self.board.gives_check(reply))
+        return heapq.nsmallest(self.PREWARM_REPLIES, self.board.legal_moves, key=reply_rank)
+
+    def _prewarm_reply_images(self, player: Player):
+        """
+        While the opponent is thinking, lets `player` warm its caches (e.g. board
+        image renders) for the positions after the opponent's likeliest replies.
+        """
+        # Work queued for the previous position is no longer useful
+        for future in self._prewarm_futures:
+            future.cancel()
+        self._prewarm_futures = []
+        
+        if self.board.is_game_over():
+            return
+        for reply in self._likely_replies():
+            board_after = self.board.copy(stack=False)
+            board_after.push(reply)
+            self._prewarm_futures.append(
+                self._render_pool.submit(player.prewarm, board_after, reply)
+            )
+
     def run(self):
         """Starts and runs the game loop until the game is over."""
+        asyncio.run(self.arun())
+
+    async def arun(self):
+        """Async game loop; lets several games share one event loop (see `run_games_batch`)."""
+        try:
+            await self._play()
+        finally:
+            self._render_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _play(self):
+        """Plays moves until the game ends or a player fails to move."""
+        for player in self.players.values():
+            player.new_game()
         while not self.board.is_game_over(claim_draw=True):
             player_color_code = self.board.turn
             player_color = "White" if player_color_code == chess.WHITE else "Black"
@@ -63,23 +131,28 @@ class Game:
             self._display_turn_header(player_color)
             
             start_time = time.time()
-            move, illegal_attempts = current_player.get_move(self.board, self.move_history)
+            move, illegal_attempts = await current_player.aget_move(self.board, self.move_history)
             end_time = time.time()
             
             move_time = end_time - start_time
             self.stats['illegal_moves'][player_color_code] += illegal_attempts
             self.stats['total_time'][player_color_code] += move_time
 
-            if move:
-                self.board.push_san(move)
-                self.move_history.append(move)
-                print(f"\n{player_color} plays: {move}")
+            if move is not None:
+                # SAN (with check suffix) needs the position before the move
+                san = self.board.san(move)
+                self._update_material(move)
+                self.board.push(move)
+                self.move_history.append(san)
+                self._prewarm_reply_images(current_player)
+                print(f"\n{player_color} plays: {san}")
                 self._display_turn_stats(move_time, player_color, player_color_code)
             else:
                 print(f"\n🔴 {player_color} ({type(current_player).__name__}) failed to provide a valid move. Game aborted.")
                 return
 
-        self._display_final_summary()
+        # Rendering is CPU-bound; keep it off the event loop so other games keep playing
+        await asyncio.to_thread(self._display_final_summary)
 
     def _display_final_summary(self):
         """Displays the final game summary and renders the animation."""
@@ -111,12 +184,14 @@ class Game:
             white_name = f"{type(white_player).__name__} {getattr(white_player, 'model', '')}".strip()
             black_name = f"{type(black_player).__name__} {getattr(black_player, 'model', '')}".strip()
 
-            timestamp = time.strftime("%Y%m%d-%H%M%S")
-            filename = f"game_{timestamp}.gif"
+            filename = self.animation_filename
+            if filename is None:
+                timestamp = time.strftime("%Y%m%d-%H%M%S")
+                filename = f"game_{timestamp}.mp4"
 
             # --- UPDATED FUNCTION CALL ---
             create_game_animation(
-                self.move_history,
+                self.board.move_stack,
                 white_name,
                 black_name,
                 self.stats['illegal_moves'][chess.WHITE],
@@ -127,4 +202,24 @@ class Game:
                 fps=2
             )
         except Exception as e:
-            print(f"🔴 Could not render animation: {e}")
\ No newline at end of file
+            print(f"🔴 Could not render animation: {e}")
+
+async def run_games_batch(pairings: list[tuple[Player, Player]]) -> list[Game]:
+    """
+    Plays several games concurrently on one event loop, so each game's LLM round
+    trips overlap with the others'. Concurrency is bounded by LLM_MAX_CONCURRENCY.
+    
+    Args:
+        pairings: (white_player, black_player) tuples, one per game. Use separate
+                  player instances per game.
+    
+    Returns:
+        The finished games, in the order of `pairings`.
+    """
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    games = [
+        Game(white, black, animation_filename=f"game_{timestamp}_{index + 1}.mp4")
+        for index, (white, black) in enumerate(pairings)
+    ]
+    await asyncio.gather(*(game.arun() for game in games))
+    return games
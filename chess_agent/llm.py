@@ -1,11 +1,95 @@
 # llm.py
 
-import litellm
-from litellm.exceptions import APIError
+# litellm is imported inside the functions that use it: importing it builds the
+# provider registry, which would otherwise slow down every CLI start.
+import asyncio
 import base64
-import io
+import diskcache
+import hashlib
+import inspect
+import orjson
+import os
+import re
+import weakref
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 from typing import Optional, List, Dict, Any
 
+# A UCI move is about three tokens; the cap still leaves room for a short preamble
+# ("Move: e2e4") while stopping chatty models almost immediately.
+MOVE_MAX_TOKENS = 8
+MOVE_STOP_SEQUENCES = ["\n"]
+
+CACHE_DIR = ".llm_cache"
+_response_cache: diskcache.Cache | None = None
+
+def get_response_cache() -> diskcache.Cache:
+    """Returns the shared on-disk response cache, opening it on first use."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = diskcache.Cache(CACHE_DIR)
+    return _response_cache
+
+def make_cache_key(*parts: Any) -> str:
+    """Builds a stable cache key from JSON-serializable parts (model, messages, ...)."""
+    # orjson serializes base64 image payloads far faster than the json module
+    payload = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload).hexdigest()
+
+# Upper bound on in-flight requests per event loop, so concurrent games respect provider limits.
+# Overridden by the LLM_MAX_CONCURRENCY environment variable.
+DEFAULT_LLM_MAX_CONCURRENCY = 8
+LLM_RETRY_ATTEMPTS = 5
+_request_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+def _request_semaphore() -> asyncio.Semaphore:
+    """
+    Returns the concurrency limiter for the running event loop (semaphores are loop-bound).
+    LLM_MAX_CONCURRENCY is read here rather than at import, so a .env loaded after
+    importing this module (as main.py does) still applies.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _request_semaphores.get(loop)
+    if semaphore is None:
+        max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_LLM_MAX_CONCURRENCY))
+        semaphore = _request_semaphores[loop] = asyncio.Semaphore(max_concurrency)
+    return semaphore
+
+def _is_transient_error(error: BaseException) -> bool:
+    """True for rate limits, timeouts, connection drops and 5xx errors, which are worth retrying."""
+    from litellm.exceptions import (APIConnectionError, APIError, InternalServerError,
+                                    RateLimitError, ServiceUnavailableError, Timeout)
+    return isinstance(error, (APIConnectionError, APIError, InternalServerError,
+                              RateLimitError, ServiceUnavailableError, Timeout, TimeoutError))
+
+def _log_retry(retry_state):
+    error = retry_state.outcome.exception()
+    print(f"⚠️ Transient LLM error: {error}. Retrying in {retry_state.next_action.sleep:.1f}s "
+          f"(Attempt {retry_state.attempt_number}/{LLM_RETRY_ATTEMPTS})...")
+
+_retry_transient_errors = retry(
+    wait=wait_random_exponential(min=1, max=30),
+    stop=stop_after_attempt(LLM_RETRY_ATTEMPTS),
+    retry=retry_if_exception(_is_transient_error),
+    before_sleep=_log_retry,
+    reraise=True,
+)
+
+@_retry_transient_errors
+async def _acompletion(read_response, **kwargs):
+    """
+    `litellm.acompletion` plus reading its response with `read_response` (which
+    may be async), with exponential backoff and bounded concurrency. The slot is
+    held until the response is read, so streamed bodies count as in flight;
+    backoff sleeps between attempts happen outside it.
+    """
+    import litellm
+    async with _request_semaphore():
+        response = await litellm.acompletion(**kwargs)
+        content = read_response(response)
+        if inspect.isawaitable(content):
+            content = await content
+        return content
+
 def encode_image_to_base64(image_bytes: bytes, format: str = "PNG") -> str:
     """
     Encodes image bytes to base64 string for LLM consumption.
@@ -17,7 +101,8 @@ def encode_image_to_base64(image_bytes: bytes, format: str = "PNG") -> str:
     Returns:
         Base64 encoded string with data URL prefix
     """
-    base64_image = base64.b64encode(image_bytes).decode('utf-8')
+    # Base64 output is pure ASCII, so the cheaper ASCII codec is sufficient
+    base64_image = base64.b64encode(image_bytes).decode('ascii')
     mime_type = f"image/{format.lower()}"
     return f"data:{mime_type};base64,{base64_image}"
 
@@ -40,16 +125,41 @@ def create_multimodal_content(text: str, image_base64: Optional[str] = None) ->
     ]
     
     if image_base64:
+        # The data URL prefix ("data:image/jpeg;base64,...") carries the MIME type
+        mime_type = image_base64.split(";", 1)[0].removeprefix("data:")
         content.append({
             "type": "image_url",
             "image_url": {
                 "url": image_base64,
-                "format": "image/png"
+                "format": mime_type
             }
         })
     
     return content
 
+def requires_cache_control(model_name: str) -> bool:
+    """
+    Checks if a model only caches prompt prefixes that are explicitly marked with
+    `cache_control` (Anthropic Claude). OpenAI-style providers cache automatically.
+    """
+    return model_name.startswith('anthropic/') or 'claude' in model_name.lower()
+
+def _with_cache_breakpoint(messages: list[dict], model_name: str) -> list[dict]:
+    """
+    For models that cache only up to an explicit `cache_control` breakpoint,
+    returns a copy of `messages` with the breakpoint on the last content block of
+    the newest message. The whole request then becomes a cacheable prefix for the
+    next one (Anthropic does not cache past a breakpoint, and a system prompt alone
+    is below its minimum cacheable length). The caller's messages are not modified.
+    """
+    if not requires_cache_control(model_name):
+        return messages
+    newest = messages[-1]
+    content = newest['content']
+    blocks = [{"type": "text", "text": content}] if isinstance(content, str) else list(content)
+    blocks[-1] = {**blocks[-1], "cache_control": {"type": "ephemeral"}}
+    return messages[:-1] + [{**newest, "content": blocks}]
+
 def check_vision_support(model_name: str) -> bool:
     """
     Checks if a model supports vision capabilities.
@@ -60,6 +170,8 @@ def check_vision_support(model_name: str) -> bool:
     Returns:
         True if the model supports vision, False otherwise
     """
+    import litellm
+    
     try:
         return litellm.supports_vision(model=model_name)
     except Exception as e:
@@ -68,48 +180,185 @@ def check_vision_support(model_name: str) -> bool:
         vision_keywords = ['vision', 'gpt-4o', 'claude-3', 'gemini-pro-vision', 'grok-2-vision']
         return any(keyword in model_name.lower() for keyword in vision_keywords)
 
-def get_llm_completion(messages: list[dict], model_name: str) -> str | None:
+def _contains_images(messages: list[dict]) -> bool:
+    """Returns True if any message carries multimodal image content."""
+    return any(
+        isinstance(msg.get('content'), list) and 
+        any(item.get('type') == 'image_url' for item in msg.get('content', []))
+        for msg in messages
+    )
+
+def _announce_multimodal_request(messages: list[dict], model_name: str):
+    """Logs multimodal requests and warns if the model may not support vision."""
+    if _contains_images(messages):
+        print(f"🖼️ Sending multimodal request (text + images) to {model_name}")
+        
+        # Verify model supports vision
+        if not check_vision_support(model_name):
+            print(f"⚠️ Warning: {model_name} may not support vision. Proceeding anyway...")
+
+def _extract_content(response, model_name: str) -> str | None:
+    """Pulls the text of the first choice out of a LiteLLM response."""
+    if response and response.choices and response.choices[0].message.content is not None:
+        return response.choices[0].message.content.strip()
+    print(f"🔴 Invalid response structure from {model_name}.")
+    return None
+
+# Characters that end a token in prose; a match followed by one of them cannot grow further.
+_STREAM_TERMINATORS = frozenset(" \t\r\n.,;:!?\"'`)")
+
+def _completed_match(buffer: str, stop_pattern: re.Pattern) -> re.Match | None:
+    """Returns the first match of `stop_pattern` once it is followed by a terminator."""
+    for match in stop_pattern.finditer(buffer):
+        if match.end() < len(buffer) and buffer[match.end()] in _STREAM_TERMINATORS:
+            return match
+    return None
+
+def _extract_contents(response, model_name: str) -> list[str] | None:
+    """Pulls the text of every choice out of a LiteLLM response."""
+    if response and response.choices:
+        contents = [choice.message.content.strip() for choice in response.choices if choice.message.content is not None]
+        if contents:
+            return contents
+    print(f"🔴 Invalid response structure from {model_name}.")
+    return None
+
+async def _aread_stream_until(stream, stop_pattern: re.Pattern) -> str:
+    """
+    Accumulates a streamed response and returns as soon as `stop_pattern` has
+    matched text that is followed by a terminator (i.e. the match is complete).
+    Always closes the stream, including on early exit, cancellation (losing
+    candidates) and mid-stream errors, so the HTTP response is released.
+    """
+    buffer = ""
+    try:
+        async for chunk in stream:
+            buffer += chunk.choices[0].delta.content or ""
+            match = _completed_match(buffer, stop_pattern)
+            if match:
+                return buffer[:match.end()].strip()
+        return buffer.strip()
+    finally:
+        await stream.aclose()
+
+async def _arequest(messages: list[dict], model_name: str, use_cache: bool, cache_parts: tuple,
+                    read_response, **request_kwargs):
+    """
+    Shared body of the completion helpers: answers from the on-disk cache when
+    enabled, otherwise sends the request and reads the result with
+    `read_response` (which may be async), caching it. Errors are reported and
+    returned as None.
+    """
+    from litellm.exceptions import APIError
+    
+    try:
+        cache_key = None
+        if use_cache:
+            cache_key = make_cache_key(model_name, messages, *cache_parts)
+            cached = get_response_cache().get(cache_key)
+            if cached is not None:
+                return cached
+        
+        _announce_multimodal_request(messages, model_name)
+        
+        content = await _acompletion(read_response, model=model_name,
+                                     messages=_with_cache_breakpoint(messages, model_name), **request_kwargs)
+        if cache_key is not None and content is not None:
+            get_response_cache().set(cache_key, content)
+        return content
+    except APIError as e:
+        print(f"🔴 API Error: Could not get completion from {model_name}. Error: {e}")
+        return None
+    except Exception as e:
+        print(f"🔴 An unexpected error occurred: {e}")
+        return None
+
+def get_llm_completion(messages: list[dict], model_name: str, temperature: float = 0.0,
+                       max_tokens: int = MOVE_MAX_TOKENS, stop: list[str] | None = MOVE_STOP_SEQUENCES,
+                       use_cache: bool = False, stop_pattern: re.Pattern | None = None) -> str | None:
     """
     Gets a completion from the specified LLM for a given message history.
     Now supports both text-only and multimodal (text + image) messages.
+    Synchronous wrapper around `aget_llm_completion`; do not call it from a
+    running event loop.
     
     Args:
         messages: A list of message dictionaries. Each message can contain:
                  - Simple text: {'role': 'user', 'content': 'text'}
                  - Multimodal: {'role': 'user', 'content': [{'type': 'text', 'text': '...'}, {'type': 'image_url', 'image_url': {...}}]}
         model_name: The name of the model to use.
+        temperature: Sampling temperature for the completion.
+        max_tokens: Upper bound on generated tokens; defaults to the size of a single move.
+        stop: Stop sequences that end generation early.
+        use_cache: If True, identical requests are answered from the on-disk cache.
+        stop_pattern: If given, the response is streamed and returned as soon as
+                      this pattern has matched, without waiting for trailing text.
 
     Returns:
         The content of the LLM's response as a string, or None if an error occurs.
     """
-    try:
-        # Check if any messages contain images
-        has_images = any(
-            isinstance(msg.get('content'), list) and 
-            any(item.get('type') == 'image_url' for item in msg.get('content', []))
-            for msg in messages
-        )
-        
-        if has_images:
-            print(f"🖼️ Sending multimodal request (text + images) to {model_name}")
-            
-            # Verify model supports vision
-            if not check_vision_support(model_name):
-                print(f"⚠️ Warning: {model_name} may not support vision. Proceeding anyway...")
-        
-        response = litellm.completion(
-            model=model_name,
-            messages=messages,
-            max_tokens=4000,
-            temperature=0.0,
-        )
-        if response and response.choices:
-            return response.choices[0].message.content.strip()
-        print(f"🔴 Invalid response structure from {model_name}.")
-        return None
-    except APIError as e:
-        print(f"🔴 API Error: Could not get completion from {model_name}. Error: {e}")
-        return None
-    except Exception as e:
-        print(f"🔴 An unexpected error occurred: {e}")
-        return None
\ No newline at end of file
+    return asyncio.run(aget_llm_completion(messages, model_name, temperature=temperature, max_tokens=max_tokens,
+                                           stop=stop, use_cache=use_cache, stop_pattern=stop_pattern))
+
+async def aget_llm_completion(messages: list[dict], model_name: str, temperature: float = 0.0,
+                              max_tokens: int = MOVE_MAX_TOKENS, stop: list[str] | None = MOVE_STOP_SEQUENCES,
+                              use_cache: bool = False, stop_pattern: re.Pattern | None = None) -> str | None:
+    """
+    Async counterpart of `get_llm_completion`, backed by `litellm.acompletion`.
+    Lets callers issue several completions concurrently with `asyncio`.
+    
+    Args:
+        messages: A list of message dictionaries (text-only or multimodal).
+        model_name: The name of the model to use.
+        temperature: Sampling temperature for the completion.
+        max_tokens: Upper bound on generated tokens; defaults to the size of a single move.
+        stop: Stop sequences that end generation early.
+        use_cache: If True, identical requests are answered from the on-disk cache.
+        stop_pattern: If given, the response is streamed and returned as soon as
+                      this pattern has matched, without waiting for trailing text.
+
+    Returns:
+        The content of the LLM's response as a string, or None if an error occurs.
+    """
+    if stop_pattern is not None:
+        read_response = lambda response: _aread_stream_until(response, stop_pattern)
+    else:
+        read_response = lambda response: _extract_content(response, model_name)
+    return await _arequest(
+        messages, model_name, use_cache,
+        (temperature, max_tokens, stop, stop_pattern.pattern if stop_pattern else None),
+        read_response,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stop=stop,
+        stream=stop_pattern is not None,
+    )
+
+async def aget_llm_completions(messages: list[dict], model_name: str, n: int, temperature: float = 0.0,
+                               max_tokens: int = MOVE_MAX_TOKENS, stop: list[str] | None = MOVE_STOP_SEQUENCES,
+                               use_cache: bool = False) -> list[str] | None:
+    """
+    Samples `n` completions in a single request (the `n` parameter), so the prompt
+    is sent and billed once. Requires a provider that supports `n`.
+    
+    Args:
+        messages: A list of message dictionaries (text-only or multimodal).
+        model_name: The name of the model to use.
+        n: Number of completions to sample.
+        temperature: Sampling temperature; use > 0 so the samples differ.
+        max_tokens: Upper bound on generated tokens per completion.
+        stop: Stop sequences that end generation early.
+        use_cache: If True, identical requests are answered from the on-disk cache.
+
+    Returns:
+        The content of each returned choice, or None if an error occurs.
+    """
+    return await _arequest(
+        messages, model_name, use_cache,
+        (n, temperature, max_tokens, stop),
+        lambda response: _extract_contents(response, model_name),
+        n=n,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        stop=stop,
+    )
@@ -1,33 +1,82 @@
 # players.py
 
+import asyncio
+import functools
 import chess
-import chess.svg
 import re
 import random
+import signal
+import threading
 import io
-import cairosvg
-from llm import get_llm_completion, encode_image_to_base64, create_multimodal_content, check_vision_support
+from collections import Counter
+from llm import aget_llm_completion, aget_llm_completions, MOVE_MAX_TOKENS, encode_image_to_base64, create_multimodal_content, check_vision_support, get_response_cache, make_cache_key
+from renderer import render_board_image
+
+# Matches moves in UCI notation (from-square, to-square, optional promotion piece).
+_UCI_RE = re.compile(r'\b([a-h][1-8][a-h][1-8][qrbn]?)\b')
+# Matches standard chess moves in SAN, including castling and promotions.
+_SAN_RE = re.compile(r'\b([NBRQK]?[a-h]?[1-8]?x?[a-h][1-8](?:=[QRBN])?|O-O-O|O-O)\b')
+# Either notation, UCI first, for spotting a complete move in a streamed response.
+_MOVE_RE = re.compile(f"{_UCI_RE.pattern}|{_SAN_RE.pattern}")
+
+# Boards are flat-colored, so a small palette PNG is ~3x smaller than full RGB
+# (JPEG is larger than either and adds ringing around the pieces)
+BOARD_IMAGE_FORMAT = "PNG"
+BOARD_PALETTE_COLORS = 32
+
+@functools.lru_cache(maxsize=256)
+def _render_board_png(board_fen: str, last_move_uci: str | None) -> bytes:
+    """
+    Renders a piece placement (and optional last-move highlight) to PNG bytes.
+    Memoized, so retries and repeated positions skip rendering entirely.
+    """
+    board = chess.BaseBoard(board_fen)
+    last_move = chess.Move.from_uci(last_move_uci) if last_move_uci else None
+    image = render_board_image(board, last_move, size=400).quantize(colors=BOARD_PALETTE_COLORS)
+    
+    buffer = io.BytesIO()
+    image.save(buffer, BOARD_IMAGE_FORMAT, optimize=True)
+    return buffer.getvalue()
 
 class Player:
     """Base class for all player types."""
-    def get_move(self, board: chess.Board, move_history: list[str]) -> tuple[str | None, int]:
+    def get_move(self, board: chess.Board, move_history: list[str]) -> tuple[chess.Move | None, int]:
         """
         Given the current board state, return a valid move and the number of
         illegal attempts made during the turn.
         
         Returns:
-            A tuple containing (valid_move, num_illegal_attempts).
+            A tuple containing (valid_move, num_illegal_attempts). The move is an
+            already-parsed chess.Move, so the game can push it without re-parsing.
         """
         raise NotImplementedError
 
+    async def aget_move(self, board: chess.Board, move_history: list[str]) -> tuple[chess.Move | None, int]:
+        """
+        Async variant of `get_move` used by the game loop. Runs the blocking
+        `get_move` in a worker thread unless a subclass provides a native version.
+        """
+        return await asyncio.to_thread(self.get_move, board, move_history)
+
+    def new_game(self):
+        """Called by the game before the first move; players with per-game state reset it here."""
+        pass
+
+    def prewarm(self, board: chess.Board, last_move: chess.Move):
+        """
+        Called from a worker thread with a position this player may be asked to move
+        in next, so it can warm its caches while the opponent thinks. No-op by default.
+        """
+        pass
+
 class LLMPlayer(Player):
     """A player controlled by a Large Language Model with advanced error handling."""
     SYSTEM_PROMPT_TEXT = """You are a specialized chess move execution engine. Your output is parsed directly by a computer program. It is critical that you follow the output format precisely. Any deviation will result in a system error.
 
 **Instructions:**
-1.  Analyze the position provided in the user prompt (FEN, history, etc.).
+1.  Analyze the position provided in the user prompt (FEN, recent moves, etc.).
 2.  Determine the single best move.
-3.  Your response MUST BE ONLY the move in Standard Algebraic Notation (SAN).
+3.  Your response MUST BE ONLY the move in UCI notation (from-square followed by to-square, plus the promotion piece if any).
 
 **Output Format Rules:**
 - DO NOT include any explanations, commentary, or conversational text (e.g., "The best move is...").
@@ -35,25 +84,25 @@ class LLMPlayer(Player):
 - Your response must be a single, plain text string representing the move.
 
 **Examples of CORRECT output:**
-e4
-Nf3
-Bxg7
-O-O
-a8=Q
+e2e4
+g1f3
+b2g7
+e1g1
+a7a8q
 
 **Examples of INCORRECT output:**
-The best move is e4.
-"Nf3"
-`Bxg7`
+The best move is e2e4.
+"g1f3"
+`b2g7`
 """
 
     SYSTEM_PROMPT_IMAGE = """You are a specialized chess move execution engine. Your output is parsed directly by a computer program. It is critical that you follow the output format precisely. Any deviation will result in a system error.
 
 **Instructions:**
 1.  Analyze the chess board position shown in the image provided.
-2.  Consider the game context (FEN, move history) provided in the text.
+2.  Consider the game context (FEN, recent moves) provided in the text.
 3.  Determine the single best move for your color.
-4.  Your response MUST BE ONLY the move in Standard Algebraic Notation (SAN).
+4.  Your response MUST BE ONLY the move in UCI notation (from-square followed by to-square, plus the promotion piece if any).
 
 **Output Format Rules:**
 - DO NOT include any explanations, commentary, or conversational text (e.g., "The best move is...").
@@ -61,19 +110,28 @@ The best move is e4.
 - Your response must be a single, plain text string representing the move.
 
 **Examples of CORRECT output:**
-e4
-Nf3
-Bxg7
-O-O
-a8=Q
+e2e4
+g1f3
+b2g7
+e1g1
+a7a8q
 
 **Examples of INCORRECT output:**
-The best move is e4.
-"Nf3"
-`Bxg7`
+The best move is e2e4.
+"g1f3"
+`b2g7`
 """
 
-    def __init__(self, model_name: str, input_type: str = 'ascii', max_retries: int = 3, on_failure: str = 'abort'):
+    # Sampling temperature used when several candidates or votes are requested, so they differ.
+    CANDIDATE_TEMPERATURE = 0.3
+    # Half-moves of history included in the prompt; the FEN already encodes the position.
+    HISTORY_WINDOW = 16
+    # In conversation mode, own turns between full FEN/board context messages; each one
+    # starts a fresh conversation, which bounds its length.
+    FULL_CONTEXT_INTERVAL = 10
+
+    def __init__(self, model_name: str, input_type: str = 'ascii', max_retries: int = 3, on_failure: str = 'abort', candidates: int = 1,
+                 use_cache: bool = False, vote_k: int = 1, conversation: bool = False, include_ascii_board: bool = False):
         """
         Initializes the LLM Player.
         Args:
@@ -81,14 +139,43 @@ The best move is e4.
             input_type: Type of board input - 'ascii' for text board or 'image' for rendered PNG.
             max_retries: The maximum number of times to retry after an illegal move.
             on_failure: Strategy if max_retries is reached. 'abort' or 'random'.
+            candidates: Number of completions requested concurrently per attempt.
+                        The first legal move wins and the remaining requests are cancelled.
+            use_cache: If True, LLM responses and accepted moves are cached on disk, so
+                       positions seen before (including transpositions) skip the LLM call.
+            vote_k: If > 1, sample this many moves in one request (n=vote_k) and play the
+                    legal move with the most votes. Requires a provider that supports `n`.
+            conversation: If True, keep one conversation per game and send only the moves
+                          played since the last turn, so the provider can reuse the prefix.
+                          The full position is resent every FULL_CONTEXT_INTERVAL turns,
+                          restarting the conversation. The move cache is not used in this mode.
+            include_ascii_board: If True, 'ascii' prompts add the 8-line ASCII diagram to the
+                                 FEN on every turn. By default FEN is the only board text, as it
+                                 already encodes the full position; the diagram is added on retries.
         """
         self.model = model_name
         self.input_type = input_type.lower()
         self.max_retries = max_retries
         self.on_failure = on_failure
+        self.candidates = candidates
+        self.use_cache = use_cache
+        self.vote_k = vote_k
+        self.conversation = conversation
+        self.include_ascii_board = include_ascii_board
+        self.new_game()
         
         if self.input_type not in ['ascii', 'image']:
             raise ValueError("input_type must be 'ascii' or 'image'")
+        if self.candidates < 1:
+            raise ValueError("candidates must be at least 1")
+        if self.vote_k < 1:
+            raise ValueError("vote_k must be at least 1")
+        if self.candidates > 1 and self.vote_k > 1:
+            raise ValueError("candidates and vote_k cannot both be greater than 1")
+        
+        # Built once so every request starts with an identical, cacheable prefix
+        system_prompt = self.SYSTEM_PROMPT_IMAGE if self.input_type == 'image' else self.SYSTEM_PROMPT_TEXT
+        self._system_message = {"role": "system", "content": system_prompt}
         
         # Validate vision support for image input
         if self.input_type == 'image':
@@ -101,6 +188,22 @@ The best move is e4.
         print(f"🤖 Initialized LLMPlayer with model: {self.model}")
         print(f"   📊 Input Type: {input_type_display}")
         print(f"   🔄 Max Retries: {self.max_retries}, On Failure: {self.on_failure}")
+        if self.candidates > 1:
+            print(f"   🎲 Concurrent Candidates: {self.candidates}")
+        if self.vote_k > 1:
+            print(f"   🗳️ Majority Vote: {self.vote_k} samples per request")
+        if self.use_cache:
+            print("   💾 Response Cache: enabled")
+        if self.conversation:
+            print("   💬 Conversation Mode: enabled")
+        if self.include_ascii_board and self.input_type == 'ascii':
+            print("   ♟️ ASCII Board: included every turn")
+
+    def new_game(self):
+        """Forgets the conversation kept from the previous game."""
+        self._conversation = None
+        self._plies_seen = 0
+        self._turns_since_full_context = 0
 
     def _render_board_as_image(self, board: chess.Board, last_move: chess.Move = None) -> bytes:
         """
@@ -114,23 +217,19 @@ The best move is e4.
             PNG image as bytes
         """
         try:
-            # Generate SVG of the current board state
-            svg_data = chess.svg.board(
-                board=board,
-                lastmove=last_move,
-                size=400,
-                coordinates=True
-            )
-            
-            # Convert SVG to PNG bytes
-            png_bytes = cairosvg.svg2png(bytestring=svg_data)
-            return png_bytes
+            last_move_uci = last_move.uci() if last_move else None
+            return _render_board_png(board.board_fen(), last_move_uci)
             
         except Exception as e:
             print(f"⚠️ Warning: Failed to render board image: {e}")
             print("   Falling back to ASCII representation")
             return None
 
+    def prewarm(self, board: chess.Board, last_move: chess.Move):
+        """Renders the board image for a likely next position into the render cache."""
+        if self.input_type == 'image':
+            self._render_board_as_image(board, last_move)
+
     def _create_initial_user_prompt(self, board: chess.Board, history: list[str]) -> dict:
         """Creates the initial user message with board state (text or image)."""
         player_color = "White" if board.turn == chess.WHITE else "Black"
@@ -138,16 +237,18 @@ The best move is e4.
         # Create text content
         text_content = f"You are playing as {player_color}.\n\n"
         text_content += f"Current board state (FEN):\n{board.fen()}\n\n"
-        text_content += f"Move history:\n{' '.join(history) if history else 'No moves yet.'}\n\n"
+        recent_moves = history[-self.HISTORY_WINDOW:]
+        text_content += f"Recent moves (SAN):\n{' '.join(recent_moves) if recent_moves else 'No moves yet.'}\n\n"
         
         if self.input_type == 'image':
             # Try to render board as image
-            last_move = board.peek() if len(history) > 0 else None
+            # The move stack, not the SAN history, says whether there is a move to highlight
+            last_move = board.move_stack[-1] if board.move_stack else None
             image_bytes = self._render_board_as_image(board, last_move)
             
             if image_bytes:
                 # Encode image to base64
-                image_base64 = encode_image_to_base64(image_bytes, "PNG")
+                image_base64 = encode_image_to_base64(image_bytes, BOARD_IMAGE_FORMAT)
                 text_content += "Please analyze the board position shown in the image."
                 
                 # Create multimodal content using correct LiteLLM format
@@ -161,7 +262,7 @@ The best move is e4.
                 # Fallback to ASCII if image rendering fails
                 text_content += f"ASCII Board:\n{str(board)}\n"
                 print("🔄 Falling back to ASCII board representation")
-        else:
+        elif self.include_ascii_board:
             # ASCII representation
             text_content += f"ASCII Board:\n{str(board)}\n"
         
@@ -170,18 +271,82 @@ The best move is e4.
             "content": text_content
         }
 
-    def _create_retry_prompt(self, board: chess.Board, illegal_move: str) -> dict:
-        """Creates a retry prompt after an illegal move."""
-        legal_moves = [board.san(m) for m in board.legal_moves]
+    def _create_update_prompt(self, board: chess.Board) -> dict:
+        """Creates the short per-turn message listing only the moves played since the last turn."""
+        new_moves = ' '.join(move.uci() for move in board.move_stack[self._plies_seen:])
+        text_content = f"Moves played since your last turn (UCI): {new_moves}. Your move."
+        
+        if self.input_type == 'image':
+            # The image is the board representation, so it is sent every turn
+            image_bytes = self._render_board_as_image(board, board.move_stack[-1])
+            if image_bytes:
+                image_base64 = encode_image_to_base64(image_bytes, BOARD_IMAGE_FORMAT)
+                return {
+                    "role": "user",
+                    "content": create_multimodal_content(text_content, image_base64)
+                }
+        
+        return {
+            "role": "user",
+            "content": text_content
+        }
+
+    def _drop_old_images(self, messages: list[dict]):
+        """
+        Replaces the content of earlier multimodal messages with their text part,
+        so a conversation carries only the newest board image rather than one per turn.
+        """
+        for message in messages:
+            content = message['content']
+            if isinstance(content, list) and any(item.get('type') == 'image_url' for item in content):
+                message['content'] = '\n'.join(item['text'] for item in content if item.get('type') == 'text')
+
+    def _start_turn_messages(self, board: chess.Board, move_history: list[str]) -> list[dict]:
+        """
+        Returns the message list for this turn. Without conversation mode this is a
+        fresh system + full-context prompt; with it, the game's conversation grows by
+        a short update, or restarts from a full-context message every
+        FULL_CONTEXT_INTERVAL turns. In image mode only the newest message keeps its
+        board image.
+        """
+        if not self.conversation:
+            return [self._system_message, self._create_initial_user_prompt(board, move_history)]
+        
+        # A shorter move stack than last turn means a different game
+        if self._conversation is None or len(board.move_stack) < self._plies_seen:
+            self.new_game()
+            self._conversation = [self._system_message]
+        
+        self._drop_old_images(self._conversation)
+        if not board.move_stack or len(self._conversation) == 1 or self._turns_since_full_context >= self.FULL_CONTEXT_INTERVAL:
+            # The full context stands on its own, so earlier turns can be dropped
+            self._conversation = [self._system_message, self._create_initial_user_prompt(board, move_history)]
+            self._turns_since_full_context = 0
+        else:
+            self._conversation.append(self._create_update_prompt(board))
+            self._turns_since_full_context += 1
+        return self._conversation
+
+    def _discard_turn(self, turn_start: int, plies_before: int):
+        """
+        Removes a turn that produced no accepted move from the conversation, so the
+        moves it reported (and whatever gets played instead) are listed next turn.
+        """
+        if self.conversation:
+            del self._conversation[turn_start - 1:]
+            self._plies_seen = plies_before
+
+    def _create_retry_prompt(self, board: chess.Board, illegal_move: str, legal_ucis: set[str]) -> dict:
+        """Creates a retry prompt after an illegal move, listing the turn's legal moves in UCI."""
         text_content = f"""Your previous move '{illegal_move}' was illegal. 
 The current board state is FEN: {board.fen()}.
-You must adhere to the output format rules and provide a move from the following list of legal moves: {legal_moves}"""
+You must adhere to the output format rules and provide a move from the following list of legal moves: {sorted(legal_ucis)}"""
         
         if self.input_type == 'image':
             # Include updated board image for retry
             image_bytes = self._render_board_as_image(board)
             if image_bytes:
-                image_base64 = encode_image_to_base64(image_bytes, "PNG")
+                image_base64 = encode_image_to_base64(image_bytes, BOARD_IMAGE_FORMAT)
                 text_content += "\n\nPlease refer to the updated board image."
                 
                 # Create multimodal content using correct LiteLLM format
@@ -191,77 +356,236 @@ You must adhere to the output format rules and provide a move from the following
                     "role": "user",
                     "content": multimodal_content
                 }
+        else:
+            # The model has already erred, so give it the diagram as extra context
+            text_content += f"\nASCII Board:\n{str(board)}\n"
         
         return {
             "role": "user",
             "content": text_content
         }
 
+    def _extract_uci_from_response(self, text: str) -> str | None:
+        """Uses regex to find a chess move in UCI format from the LLM's response."""
+        match = _UCI_RE.search(text)
+        if match:
+            return match.group(0)
+        return None
+
     def _extract_san_from_response(self, text: str) -> str | None:
         """Uses regex to find a chess move in SAN format from the LLM's response."""
-        # This regex looks for standard chess moves, including castling and promotions.
-        san_pattern = r'\b([NBRQK]?[a-h]?[1-8]?x?[a-h][1-8](?:=[QRBN])?|O-O-O|O-O)\b'
-        match = re.search(san_pattern, text)
+        match = _SAN_RE.search(text)
         if match:
             return match.group(0)
         return None
 
-    def get_move(self, board: chess.Board, move_history: list[str]) -> tuple[str | None, int]:
+    def _parse_move(self, board: chess.Board, move: str, legal_ucis: set[str] | None = None) -> chess.Move | None:
         """
-        Manages the conversation with the LLM to get a valid move, with retries.
+        Parses a UCI (or, as a fallback, SAN) move and returns it if it is legal in
+        the given position. UCI needs no disambiguation, so it is tried first; with
+        the turn's legal UCI set, that is a single set lookup.
         """
-        # Choose system prompt based on input type
-        system_prompt = self.SYSTEM_PROMPT_IMAGE if self.input_type == 'image' else self.SYSTEM_PROMPT_TEXT
+        if legal_ucis is not None and move in legal_ucis:
+            return chess.Move.from_uci(move)
+        try:
+            uci_move = chess.Move.from_uci(move)
+        except ValueError:
+            pass
+        else:
+            if legal_ucis is not None:
+                return None
+            return uci_move if uci_move in board.legal_moves else None
+        try:
+            # parse_san validates without copying or mutating the board; the
+            # invalid/illegal/ambiguous move errors all subclass ValueError.
+            san_move = board.parse_san(move)
+        except ValueError:
+            return None
+        # parse_san maps '--', 'Z0' and '@@@@' to the null move, which would skip the turn
+        return san_move or None
+
+    def _move_from_response(self, response: str) -> str:
+        """Attempts to extract a clean move (UCI, else SAN) from a potentially messy response."""
+        extracted_move = self._extract_uci_from_response(response) or self._extract_san_from_response(response)
+        return extracted_move if extracted_move else response.strip()
+
+    async def _vote_candidates(self, board: chess.Board, messages: list[dict],
+                               legal_ucis: set[str] | None = None) -> tuple[str | None, str | None, chess.Move | None]:
+        """
+        Samples `self.vote_k` moves in a single request and returns the legal move
+        with the most votes (ties go to the move sampled first).
+        
+        Returns:
+            A tuple of (assistant_response, move_to_try, legal_move). If no sample is
+            legal, legal_move is None and the first response is returned for retry feedback.
+        """
+        responses = await aget_llm_completions(messages, self.model, n=self.vote_k,
+                                               temperature=self.CANDIDATE_TEMPERATURE,
+                                               max_tokens=MOVE_MAX_TOKENS, use_cache=self.use_cache)
+        if not responses:
+            return None, None, None
+        
+        # Count votes per parsed move, so 'g1f3', 'Nf3' and 'Nf3+' are the same vote
+        votes = Counter()
+        first_seen = {}
+        for response in responses:
+            move_to_try = self._move_from_response(response)
+            move = self._parse_move(board, move_to_try, legal_ucis)
+            if move is None:
+                continue
+            votes[move] += 1
+            first_seen.setdefault(move, (response, move_to_try))
         
-        turn_messages = [
-            {"role": "system", "content": system_prompt},
-            self._create_initial_user_prompt(board, move_history)
+        if not votes:
+            return responses[0], self._move_from_response(responses[0]), None
+        
+        winner, count = votes.most_common(1)[0]
+        assistant_response, move_to_try = first_seen[winner]
+        print(f"🗳️ {move_to_try} won with {count}/{len(responses)} votes")
+        return assistant_response, move_to_try, winner
+
+    async def _sample_candidates(self, board: chess.Board, messages: list[dict],
+                                 legal_ucis: set[str] | None = None) -> tuple[str | None, str | None, chess.Move | None]:
+        """
+        Requests `self.candidates` completions concurrently and returns the first
+        one that contains a legal move, cancelling the requests still in flight.
+        
+        Returns:
+            A tuple of (assistant_response, move_to_try, legal_move). If no candidate is
+            legal, legal_move is None and the first usable response is returned for retry feedback.
+        """
+        temperature = self.CANDIDATE_TEMPERATURE if self.candidates > 1 else 0.0
+        tasks = [
+            asyncio.create_task(aget_llm_completion(messages, self.model, temperature=temperature, max_tokens=MOVE_MAX_TOKENS,
+                                                   use_cache=self.use_cache and self.candidates == 1,
+                                                   stop_pattern=_MOVE_RE))
+            for _ in range(self.candidates)
         ]
         
+        fallback_response, fallback_move = None, None
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                assistant_response = await next_completed
+                if assistant_response is None:
+                    continue
+                
+                move_to_try = self._move_from_response(assistant_response)
+                legal_move = self._parse_move(board, move_to_try, legal_ucis)
+                if legal_move is not None:
+                    return assistant_response, move_to_try, legal_move
+                if fallback_response is None:
+                    fallback_response, fallback_move = assistant_response, move_to_try
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        return fallback_response, fallback_move, None
+
+    def _move_cache_key(self, board: chess.Board) -> str:
+        """
+        Cache key for an accepted move. EPD omits the move clocks, so the same
+        position reached through a different move order maps to the same key.
+        """
+        return make_cache_key("move", self.model, self.input_type, board.epd())
+
+    async def aget_move(self, board: chess.Board, move_history: list[str]) -> tuple[chess.Move | None, int]:
+        """
+        Manages the conversation with the LLM to get a valid move, with retries.
+        Each attempt samples `self.candidates` completions concurrently.
+        """
+        # A cached move would be missing from the conversation, so conversations skip the move cache
+        use_move_cache = self.use_cache and not self.conversation
+        if use_move_cache:
+            cached_uci = get_response_cache().get(self._move_cache_key(board))
+            cached_move = self._parse_move(board, cached_uci) if cached_uci is not None else None
+            if cached_move is not None:
+                print(f"💾 Reusing cached move for this position: {cached_move.uci()}")
+                return cached_move, 0
+        
+        turn_messages = self._start_turn_messages(board, move_history)
+        # Where this turn's attempts start, and what the conversation covered before it
+        turn_start, plies_before = len(turn_messages), self._plies_seen
+        # Moves up to here are now in the conversation; ours is added once accepted
+        self._plies_seen = len(board.move_stack)
+        
         illegal_attempts = 0
+        # Every response is validated by membership in this set, built once per turn
+        legal_ucis = {move.uci() for move in board.legal_moves}
         for attempt in range(self.max_retries):
-            assistant_response = get_llm_completion(turn_messages, self.model)
+            if self.vote_k > 1:
+                assistant_response, move_to_try, legal_move = await self._vote_candidates(board, turn_messages, legal_ucis)
+            else:
+                assistant_response, move_to_try, legal_move = await self._sample_candidates(board, turn_messages, legal_ucis)
             if assistant_response is None:
+                self._discard_turn(turn_start, plies_before)
                 return None, illegal_attempts
 
-            # Attempt to extract a clean move from a potentially messy response
-            extracted_move = self._extract_san_from_response(assistant_response)
-            move_to_try = extracted_move if extracted_move else assistant_response.strip()
-
             turn_messages.append({"role": "assistant", "content": assistant_response})
 
-            board_copy = board.copy()
-            try:
-                board_copy.push_san(move_to_try)
-                # If successful, the move is valid
-                return move_to_try, illegal_attempts
-            except ValueError:
-                illegal_attempts += 1
-                print(f"🔴 LLM provided an illegal move: '{move_to_try}'. Retrying (Attempt {attempt + 1}/{self.max_retries})...")
-                
-                # Create retry prompt with updated board state
-                retry_message = self._create_retry_prompt(board, move_to_try)
-                turn_messages.append(retry_message)
+            if legal_move is not None:
+                if use_move_cache:
+                    get_response_cache().set(self._move_cache_key(board), legal_move.uci())
+                if self.conversation:
+                    # Keep only the accepted answer; failed attempts would be resent every turn
+                    del turn_messages[turn_start:-1]
+                self._plies_seen += 1
+                return legal_move, illegal_attempts
+            
+            illegal_attempts += 1
+            print(f"🔴 LLM provided an illegal move: '{move_to_try}'. Retrying (Attempt {attempt + 1}/{self.max_retries})...")
+            
+            # Create retry prompt with updated board state
+            retry_message = self._create_retry_prompt(board, move_to_try, legal_ucis)
+            if self.conversation:
+                self._drop_old_images(turn_messages)
+            turn_messages.append(retry_message)
         
         # If the loop finishes, max_retries was reached
         print(f"🔴 LLM failed to provide a valid move after {self.max_retries} attempts.")
+        self._discard_turn(turn_start, plies_before)
         if self.on_failure == 'random':
-            random_move = random.choice([board.san(m) for m in board.legal_moves])
-            print(f"Falling back to random move: {random_move}")
+            random_move = random.choice(list(board.legal_moves))
+            print(f"Falling back to random move: {random_move.uci()}")
             return random_move, illegal_attempts
         else: # 'abort' is the default
             return None, illegal_attempts
 
+    def get_move(self, board: chess.Board, move_history: list[str]) -> tuple[chess.Move | None, int]:
+        """
+        Synchronous entry point; runs the concurrent move search to completion.
+        """
+        return asyncio.run(self.aget_move(board, move_history))
+
 class HumanPlayer(Player):
     """A player controlled by a human via the console."""
-    def get_move(self, board: chess.Board, move_history: list[str]) -> tuple[str | None, int]:
+    async def aget_move(self, board: chess.Board, move_history: list[str]) -> tuple[chess.Move | None, int]:
+        """
+        Reads the move on the event loop thread; blocking the loop is fine for a
+        human turn. asyncio.run's SIGINT handler only cancels the main task, which
+        cannot happen while input() blocks, so the default handler is restored to
+        let Ctrl-C raise KeyboardInterrupt immediately.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return self.get_move(board, move_history)
+        previous_handler = signal.signal(signal.SIGINT, signal.default_int_handler)
+        try:
+            return self.get_move(board, move_history)
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+
+    def get_move(self, board: chess.Board, move_history: list[str]) -> tuple[chess.Move | None, int]:
         illegal_attempts = 0
+        legal_moves_str = [board.san(m) for m in board.legal_moves]
         while True:
-            legal_moves_str = [board.san(m) for m in board.legal_moves]
             print("\nYour turn. Legal moves:", legal_moves_str)
             move = input("Enter your move in SAN: ")
-            if move in legal_moves_str:
-                return move, illegal_attempts
-            else:
-                illegal_attempts += 1
-                print(f"🔴 Illegal move '{move}'. Please try again.")
\ No newline at end of file
+            try:
+                # Parsed directly against the position; also accepts e.g. 'Nf3' for 'Nf3+'
+                parsed_move = board.parse_san(move)
+            except ValueError:
+                parsed_move = None
+            # parse_san turns '--' into a null move, which is not a real move
+            if parsed_move:
+                return parsed_move, illegal_attempts
+            illegal_attempts += 1
+            print(f"🔴 Illegal move '{move}'. Please try again.")
\ No newline at end of file
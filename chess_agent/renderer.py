@@ -2,8 +2,9 @@
 
 import chess
 import chess.svg
-import cairosvg
+import functools
 import imageio
+import numpy as np
 import os
 import io
 from tqdm import tqdm
@@ -20,110 +21,225 @@ BACKGROUND_COLOR = "#2c2f33"
 TEXT_COLOR = "#ffffff"
 TEXT_COLOR_SUBTLE = "#bbbbbb" # A lighter grey for secondary info
 
-def _find_font(size: int) -> ImageFont.FreeTypeFont | None:
-    """Tries to find a common system font and returns a Pillow font object."""
+# --- chess.svg Geometry (in SVG units, coordinates enabled) ---
+SVG_SQUARE_SIZE = 45
+SVG_MARGIN = 15
+SVG_FULL_SIZE = 8 * SVG_SQUARE_SIZE + 2 * SVG_MARGIN
+LASTMOVE_COLORS = {"square light": "#cdd16a", "square dark": "#aaa23b"}
+
+def _svg_to_png(svg_data: str) -> bytes:
+    """
+    Rasterizes an SVG string to PNG bytes. Uses resvg (native Rust) when the
+    optional resvg_py package is installed, otherwise cairosvg.
+    """
+    try:
+        import resvg_py
+    except ImportError:
+        import cairosvg  # Imported lazily; loading the cairo libraries is slow
+        return cairosvg.svg2png(bytestring=svg_data.encode("utf-8"))
+    # Older resvg_py releases return a list of ints rather than bytes
+    return bytes(resvg_py.svg_to_bytes(svg_string=svg_data))
+
+def _svg_to_image(svg_data: str) -> Image.Image:
+    """Rasterizes an SVG string to an RGBA Pillow image."""
+    return Image.open(io.BytesIO(_svg_to_png(svg_data))).convert("RGBA")
+
+@functools.lru_cache(maxsize=8)
+def _board_sprites(size: int) -> dict:
+    """
+    Rasterizes everything needed to composite a board of the given pixel size:
+    the empty board, a fully last-move-highlighted board to crop squares from,
+    one sprite per piece, and the pixel box of every square. Done once per size.
+    """
+    scale = size / SVG_FULL_SIZE
+    square_boxes = []
+    for square in chess.SQUARES:
+        left = SVG_MARGIN + chess.square_file(square) * SVG_SQUARE_SIZE
+        top = SVG_MARGIN + (7 - chess.square_rank(square)) * SVG_SQUARE_SIZE
+        square_boxes.append((
+            round(left * scale), round(top * scale),
+            round((left + SVG_SQUARE_SIZE) * scale), round((top + SVG_SQUARE_SIZE) * scale)
+        ))
+    
+    piece_size = round(SVG_SQUARE_SIZE * scale)
+    pieces = {}
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            piece = chess.Piece(piece_type, color)
+            pieces[piece.symbol()] = _svg_to_image(chess.svg.piece(piece, size=piece_size))
+    
+    return {
+        'empty': _svg_to_image(chess.svg.board(size=size, coordinates=True)),
+        'lastmove': _svg_to_image(chess.svg.board(size=size, coordinates=True, colors=LASTMOVE_COLORS)),
+        'pieces': pieces,
+        'square_boxes': square_boxes,
+    }
+
+def render_board_image(board: chess.BaseBoard, last_move: chess.Move | None = None, size: int = BOARD_SIZE) -> Image.Image:
+    """
+    Composites a board from pre-rasterized sprites: the empty board is copied,
+    last-move squares are pasted from the highlighted board and pieces are
+    alpha-blended on top. Equivalent to rasterizing chess.svg.board, without
+    parsing SVG per call.
+    """
+    sprites = _board_sprites(size)
+    image = sprites['empty'].copy()
+    square_boxes = sprites['square_boxes']
+    
+    if last_move:
+        for square in (last_move.from_square, last_move.to_square):
+            box = square_boxes[square]
+            image.paste(sprites['lastmove'].crop(box), box)
+    
+    for square, piece in board.piece_map().items():
+        image.alpha_composite(sprites['pieces'][piece.symbol()], dest=square_boxes[square][:2])
+    
+    return image.convert("RGB")
+
+def _locate_font() -> str | None:
+    """Returns the path of the first common system font found, or None."""
     font_paths = [
         '/System/Library/Fonts/Supplemental/Arial.ttf',  # macOS
         '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',  # Linux
         'C:/Windows/Fonts/arial.ttf',  # Windows
         'Arial.ttf' # Fallback
     ]
-    font_path = None
     for path in font_paths:
         if os.path.exists(path):
-            font_path = path
-            break
-    
-    if not font_path:
+            return path
+    return None
+
+# Resolved once at import instead of probing the filesystem on every lookup
+_FONT_PATH = _locate_font()
+
+@functools.lru_cache(maxsize=8)
+def _find_font(size: int) -> ImageFont.FreeTypeFont | None:
+    """Returns a Pillow font object for the system font; loaded once per size."""
+    if not _FONT_PATH:
         print("⚠️ Warning: Could not find a system font. Text will not be rendered.")
         return None
     
     try:
-        return ImageFont.truetype(font_path, size)
+        return ImageFont.truetype(_FONT_PATH, size)
     except IOError:
-        print(f"⚠️ Warning: Could not load font at {font_path}. Text will not be rendered.")
+        print(f"⚠️ Warning: Could not load font at {_FONT_PATH}. Text will not be rendered.")
         return None
 
+@functools.lru_cache(maxsize=4)
+def _header_template(header: tuple) -> Image.Image:
+    """
+    Draws the header text (player names, times and illegal-move counts), which
+    is the same on every frame of an animation, onto a transparent overlay.
+    Cached, so each process draws it once.
+    """
+    white_player_name, black_player_name, white_final_illegal, black_final_illegal, white_total_time, black_total_time = header
+    font_player = _find_font(18)
+    font_stats = _find_font(14) # Smaller font for stats
+
+    # Taller than the header: the last line's descenders reach into the board margin
+    template = Image.new('RGBA', (CANVAS_WIDTH, HEADER_HEIGHT + FOOTER_HEIGHT), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(template)
+    padding = 10
+    y_pos = padding
+
+    # White Player Info
+    draw.text((padding, y_pos), f"White: {white_player_name}", font=font_player, fill=TEXT_COLOR)
+    y_pos += 22
+    white_stats_text = f"Time: {white_total_time:.2f}s | Illegal Moves: {white_final_illegal}"
+    draw.text((padding, y_pos), white_stats_text, font=font_stats, fill=TEXT_COLOR_SUBTLE)
+    y_pos += 20
+
+    # Black Player Info
+    draw.text((padding, y_pos), f"Black: {black_player_name}", font=font_player, fill=TEXT_COLOR)
+    y_pos += 22
+    black_stats_text = f"Time: {black_total_time:.2f}s | Illegal Moves: {black_final_illegal}"
+    draw.text((padding, y_pos), black_stats_text, font=font_stats, fill=TEXT_COLOR_SUBTLE)
+
+    return template
+
+def _render_frame(frame_args: tuple) -> Image.Image:
+    """
+    Renders one annotated animation frame from its own position and the shared
+    header stats.
+    
+    Args:
+        frame_args: (fen, last_move_uci, frame_index, header) where header is
+            (white_name, black_name, white_illegal, black_illegal, white_time, black_time).
+    """
+    fen, last_move_uci, i, header = frame_args
+    board = chess.Board(fen)
+    last_move = chess.Move.from_uci(last_move_uci) if last_move_uci else None
+
+    canvas = Image.new('RGB', (CANVAS_WIDTH, CANVAS_HEIGHT), BACKGROUND_COLOR)
+    
+    # Composited from cached sprites rather than rasterizing a full board SVG
+    canvas.paste(render_board_image(board, last_move), (0, HEADER_HEIGHT))
+
+    header_template = _header_template(header)
+    canvas.paste(header_template, (0, 0), header_template)
+
+    # --- Footer Section (the only text that changes per frame) ---
+    font_info = _find_font(16)
+    draw = ImageDraw.Draw(canvas)
+    padding = 10
+    move_num_str = f"Move: {(i // 2) + 1 if i > 0 else 1}"
+    player_turn = "White" if board.turn == chess.WHITE else "Black"
+    status_str = f"{move_num_str} | Turn: {player_turn}"
+    draw.text((padding, HEADER_HEIGHT + BOARD_SIZE + padding), status_str, font=font_info, fill=TEXT_COLOR)
+
+    return canvas
+
+def _get_animation_writer(output_filename: str, fps: int):
+    """
+    Opens an imageio writer for the animation: the GIF encoder for .gif files,
+    otherwise an H.264 video via ffmpeg (much faster to encode and far smaller).
+    """
+    if output_filename.lower().endswith('.gif'):
+        return imageio.get_writer(output_filename, mode='I', fps=fps)
+    # yuv420p needs even dimensions; pad with the background instead of letting imageio rescale
+    return imageio.get_writer(output_filename, fps=fps, codec='libx264', macro_block_size=1,
+                              ffmpeg_params=['-vf', f"pad=ceil(iw/2)*2:ceil(ih/2)*2:color={BACKGROUND_COLOR}"])
+
 def create_game_animation(
-    move_history: list[str],
+    move_history: list[str | chess.Move],
     white_player_name: str,
     black_player_name: str,
     white_final_illegal: int,
     black_final_illegal: int,
     white_total_time: float,
     black_total_time: float,
-    output_filename: str = "chess_game.gif",
+    output_filename: str = "chess_game.mp4",
     fps: int = 2
 ):
-    """Renders a game from a move history into an annotated animated GIF."""
-    temp_dir = "temp_render"
-    os.makedirs(temp_dir, exist_ok=True)
+    """
+    Renders a game from a move history into an annotated MP4 video, or an
+    animated GIF if output_filename ends in .gif.
+    
+    Args:
+        move_history: The game's moves, as SAN strings or already-parsed chess.Move
+            objects (e.g. a board's move_stack), which skip SAN parsing.
+    """
+    # --- Check Fonts ---
+    if not _find_font(18) or not _find_font(16) or not _find_font(14):
+        return # Abort if fonts can't be loaded
 
-    image_paths = []
+    # --- Replay the game once to get every frame's position ---
+    header = (white_player_name, black_player_name, white_final_illegal, black_final_illegal, white_total_time, black_total_time)
     board = chess.Board()
-
-    # --- Load Fonts ---
-    font_player = _find_font(18)
-    font_stats = _find_font(14) # Smaller font for stats
-    font_info = _find_font(16)
-    if not font_player or not font_info or not font_stats:
-        return # Abort if fonts can't be loaded
+    frame_args = [(board.fen(), None, 0, header)]
+    for i, move in enumerate(move_history):
+        if isinstance(move, str):
+            move = board.parse_san(move)
+        board.push(move)
+        frame_args.append((board.fen(), move.uci(), i + 1, header))
 
     print("Generating frames for animation...")
     
-    # --- Create a frame for each move in the history ---
-    for i in tqdm(range(len(move_history) + 1), desc="Rendering Moves"):
-        canvas = Image.new('RGB', (CANVAS_WIDTH, CANVAS_HEIGHT), BACKGROUND_COLOR)
-        
-        last_move = board.peek() if i > 0 else None
-        board_svg = chess.svg.board(board=board, lastmove=last_move, size=BOARD_SIZE)
-        board_png_data = cairosvg.svg2png(bytestring=board_svg)
-        board_image = Image.open(io.BytesIO(board_png_data))
-
-        canvas.paste(board_image, (0, HEADER_HEIGHT))
-
-        # --- Draw Text Information on the Canvas ---
-        draw = ImageDraw.Draw(canvas)
-        padding = 10
-        y_pos = padding
-
-        # --- Header Section ---
-        # White Player Info
-        draw.text((padding, y_pos), f"White: {white_player_name}", font=font_player, fill=TEXT_COLOR)
-        y_pos += 22
-        white_stats_text = f"Time: {white_total_time:.2f}s | Illegal Moves: {white_final_illegal}"
-        draw.text((padding, y_pos), white_stats_text, font=font_stats, fill=TEXT_COLOR_SUBTLE)
-        y_pos += 20
-
-        # Black Player Info
-        draw.text((padding, y_pos), f"Black: {black_player_name}", font=font_player, fill=TEXT_COLOR)
-        y_pos += 22
-        black_stats_text = f"Time: {black_total_time:.2f}s | Illegal Moves: {black_final_illegal}"
-        draw.text((padding, y_pos), black_stats_text, font=font_stats, fill=TEXT_COLOR_SUBTLE)
-
-        # --- Footer Section ---
-        move_num_str = f"Move: {(i // 2) + 1 if i > 0 else 1}"
-        player_turn = "White" if board.turn == chess.WHITE else "Black"
-        status_str = f"{move_num_str} | Turn: {player_turn}"
-        draw.text((padding, HEADER_HEIGHT + BOARD_SIZE + padding), status_str, font=font_info, fill=TEXT_COLOR)
-
-        frame_path = os.path.join(temp_dir, f"frame_{i:03d}.png")
-        canvas.save(frame_path)
-        image_paths.append(frame_path)
-
-        if i < len(move_history):
-            board.push_san(move_history[i])
-
-    # Create the GIF
-    print("Stitching frames into a GIF...")
-    with imageio.get_writer(output_filename, mode='I', fps=fps) as writer:
-        for path in tqdm(image_paths, desc="Creating GIF"):
-            writer.append_data(imageio.imread(path))
-    
-    # Clean up temporary files
-    print("Cleaning up temporary files...")
-    for path in image_paths:
-        os.remove(path)
-    os.rmdir(temp_dir)
-
-    print(f"✅ Animation successfully saved to {output_filename}")
\ No newline at end of file
+    # --- Render a frame for each move and stream it straight into the writer ---
+    # Sprite compositing takes a couple of milliseconds per frame, so worker processes
+    # would cost more to start than they save.
+    with _get_animation_writer(output_filename, fps) as writer:
+        for args in tqdm(frame_args, desc="Rendering Moves"):
+            writer.append_data(np.asarray(_render_frame(args)))
+
+    print(f"✅ Animation successfully saved to {output_filename}")